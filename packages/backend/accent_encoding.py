@@ -0,0 +1,104 @@
+# Array helpers of the accent pipeline that only need numpy, so that they can
+# be imported (and tested) without the tdmelodic / MeCab / Chainer stack.
+from typing import Optional, Union
+
+import numpy as np
+
+
+def build_lut(mapping: dict) -> np.ndarray:
+    # Dense ord(c) -> code table for the single-character ASCII keys of a tdmelodic map.
+    # Characters missing from the map fall back to 0 (the blank/None code).
+    lut = np.zeros(128, dtype=np.int32)
+    for key, code in mapping.items():
+        if isinstance(key, str) and len(key) == 1:
+            lut[ord(key)] = code
+    return lut
+
+
+# L/H accent string -> pitch levels (1=L, 2=H, anything else 0)
+PITCH_LUT = np.zeros(128, dtype=np.uint8)
+PITCH_LUT[ord("L")] = 1
+PITCH_LUT[ord("H")] = 2
+
+# tdmelodic output code -> pitch level of the next mora (0=fall -> L, 2=rise -> H, 1=keep)
+CODE_TO_LEVEL = np.array([1, 0, 2], dtype=np.uint8)
+
+
+def codes_to_levels(codes: np.ndarray) -> np.ndarray:
+    # Pitch level before each code plus the level after the last one (len(codes) + 1).
+    # A word starts high only if the first code is a fall.
+    start = 2 if (len(codes) > 0 and codes[0] == 0) else 1
+    levels = np.concatenate(([start], CODE_TO_LEVEL[codes])).astype(np.uint8)
+    # Forward-fill the "keep" entries with the last rise/fall level
+    idx = np.where(levels > 0, np.arange(len(levels)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    return levels[idx]
+
+
+def to_np(sequence: str, lut: np.ndarray, length: Optional[int] = None) -> np.ndarray:
+    # One vectorized gather instead of a dict lookup per character.
+    # With `length`, the codes are truncated or right-padded with the blank (" ") code
+    # directly in the array, rather than padding the string first.
+    codes = lut[np.frombuffer(sequence.encode("ascii"), dtype=np.uint8)]
+    if length is None or len(codes) == length:
+        return codes
+    out = np.full(length, lut[ord(" ")], dtype=np.int32)
+    n = min(length, len(codes))
+    out[:n] = codes[:n]
+    return out
+
+
+def encode_fields(
+    s_codes: tuple, y_codes: tuple, roman_lut, accent_lut, symbol_lut
+) -> tuple[tuple[np.ndarray, ...], tuple[np.ndarray, ...]]:
+    # Model inputs from the per-morpheme code strings of tdmelodic's
+    # _convert_parsed_surface_to_codes / _convert_yomi_to_codes, encoded like its
+    # data loader (inference mode) but with one LUT gather per field
+    S_vow, S_con, S_acc, S_pos, S_acccon, S_gosh = s_codes
+    Y_vow, Y_con = y_codes
+
+    # Join (every morpheme list is non-empty once get_n_best has returned a parse)
+    S_vow = " ".join(S_vow) + " "
+    S_con = " ".join(S_con) + " "
+    S_acc = "".join(S_acc)
+    S_pos = " ".join(S_pos) + " "
+    S_acccon = " ".join(S_acccon) + " "
+    S_gosh = " ".join(S_gosh) + " "
+    Y_vow = " ".join(Y_vow) + " "
+    Y_con = " ".join(Y_con) + " "
+
+    # Every field is aligned to the length of its vowel sequence
+    S_len = len(S_vow)
+    Y_len = len(Y_vow)
+
+    # Same field order as the model input: (vow, con, pos, acc, acccon, gosh)
+    s_np = (
+        to_np(S_vow, roman_lut),
+        to_np(S_con, roman_lut, S_len),
+        to_np(S_pos, symbol_lut, S_len),
+        to_np(S_acc, accent_lut, S_len),
+        to_np(S_acccon, symbol_lut, S_len),
+        to_np(S_gosh, symbol_lut, S_len),
+    )
+    y_np = (
+        to_np(Y_vow, roman_lut),
+        to_np(Y_con, roman_lut, Y_len),
+    )
+    return s_np, y_np
+
+
+def is_katakana(text: str) -> bool:
+    return all("ァ" <= c <= "ヺ" or c == "ー" for c in text)
+
+
+def render_accent(morae: list[str], pattern: Union[list[int], np.ndarray]) -> str:
+    # Patterns are a handful of morae: plain lists beat numpy's per-call overhead
+    p = pattern.tolist() if isinstance(pattern, np.ndarray) else list(pattern)
+    prev = [0] + p[:-1]
+    nxt = p[1:] + [0]
+    # "[" before a mora where the pitch rises (L -> H), "]" after one where it falls (H -> L).
+    # zip stops at the shorter of morae / pattern.
+    return "".join(
+        ("[" if a == 1 and b == 2 else "") + m + ("]" if b == 2 and c == 1 else "")
+        for m, a, b, c in zip(morae, prev, p, nxt)
+    )
@@ -0,0 +1,109 @@
+# Micro-batching of the accent model's forward passes. Kept free of the
+# tdmelodic / Chainer imports: the model is any object with tdmelodic's
+# InferAccent.infer signature, or an onnxruntime session.
+import concurrent.futures
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+# Only equal-length inputs can share a forward pass, and concurrent requests
+# rarely match, so by default the server does not wait for more: requests that
+# queue up while the model is busy are still batched. Offline conversion
+# (convert_batch) submits many words at once and uses a window of its own.
+MAX_BATCH_SIZE = int(os.environ.get("HASHI_MAX_BATCH_SIZE", 16))
+MAX_WAIT_MS = float(os.environ.get("HASHI_MAX_WAIT_MS", 0))
+
+# Input/output names of the ONNX export (scripts/export_onnx.py)
+ONNX_INPUT_NAMES = [
+    "s_vow",
+    "s_con",
+    "s_pos",
+    "s_acc",
+    "s_acccon",
+    "s_gosh",
+    "y_vow",
+    "y_con",
+]
+ONNX_OUTPUT_NAME = "accent"
+
+
+class AccentBatcher:
+    # Coalesces concurrent inference requests into forward passes over equal-length inputs.
+    # The worker thread is the only caller of the (non-thread-safe) Chainer model.
+
+    def __init__(
+        self,
+        model,
+        session=None,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait_ms: float = MAX_WAIT_MS,
+    ):
+        self.model = model
+        self.session = session
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, s_np, y_np) -> concurrent.futures.Future:
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._queue.put((s_np, y_np, future))
+        return future
+
+    def infer(self, s_np, y_np) -> np.ndarray:
+        # Blocks the calling thread until its batch has been run
+        return self.submit(s_np, y_np).result()
+
+    def _collect(self) -> list:
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    items.append(self._queue.get(timeout=timeout))
+                else:
+                    # Past the window: still take whatever is already queued
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _forward(self, batch) -> np.ndarray:
+        if self.session is not None:
+            feed = dict(zip(ONNX_INPUT_NAMES, batch))
+            return self.session.run([ONNX_OUTPUT_NAME], feed)[0]
+        X_s, X_y = batch[:-2], batch[-2:]
+        y_dummy_GT = X_y[0] * 0
+        return np.asarray(self.model.infer(X_s, X_y, y_dummy_GT))
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            # Only inputs of identical (surface, yomi) lengths share a forward pass.
+            # The model's attention has no padding mask, so zero padding would make
+            # a word's prediction depend on which other requests it was batched with.
+            groups: dict = {}
+            for item in items:
+                s_np, y_np, _ = item
+                groups.setdefault((len(s_np[0]), len(y_np[0])), []).append(item)
+            for group in groups.values():
+                self._run_group(group)
+
+    def _run_group(self, items):
+        try:
+            # Equal lengths, so stacking each field is all the collation needed
+            fields = zip(*(s_np + y_np for s_np, y_np, _ in items))
+            batch = tuple(np.stack(field) for field in fields)
+            a_est = self._forward(batch)
+        except Exception as e:
+            for _, _, future in items:
+                future.set_exception(e)
+            return
+
+        for (_, _, future), codes in zip(items, a_est):
+            future.set_result(codes)
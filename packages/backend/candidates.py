@@ -0,0 +1,79 @@
+# The target-word candidates (data/candidates.db, built by scripts/build_db.py),
+# held in memory at serving time. Only needs sqlite3 and orjson.
+import bisect
+import pathlib
+import random
+import sqlite3
+from typing import Callable, NamedTuple, Optional, Union
+
+import orjson
+
+
+def get_db_connection(db_path: str) -> sqlite3.Connection:
+    # The app only reads the DB, which build_db.py replaces offline: immutable=1
+    # lets SQLite skip file locking and change detection, and mode=ro fails on
+    # a missing file instead of creating an empty database
+    uri = pathlib.Path(db_path).resolve().as_uri() + "?mode=ro&immutable=1"
+    conn = sqlite3.connect(uri, uri=True)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def decode_pattern(value: Union[bytes, str]) -> list[int]:
+    # One byte per mora; databases built before that stored a JSON list
+    if isinstance(value, bytes):
+        return list(value)
+    return orjson.loads(value)
+
+
+class Candidate(NamedTuple):
+    text: str
+    reading: str
+    accent_pattern: list[int]
+    accent_code: str
+    mora_count: int
+
+
+class CandidatePool:
+    # The candidates table is static at serving time, so every row is held in
+    # memory, sorted by mora count: a random pick in a mora range is two
+    # bisections and an index draw, with no SQLite round trip per request.
+
+    def __init__(self, candidates: list[Candidate]):
+        self.candidates = candidates
+        self._mora_counts = [c.mora_count for c in candidates]
+
+    def pick(self, min_mora: int, max_mora: int) -> Optional[Candidate]:
+        lo = bisect.bisect_left(self._mora_counts, min_mora)
+        hi = bisect.bisect_right(self._mora_counts, max_mora)
+        if lo >= hi:
+            return None
+        return self.candidates[random.randrange(lo, hi)]
+
+
+def load_candidates(
+    db_path: str, visualize: Callable[[str, list[int]], str]
+) -> CandidatePool:
+    # `visualize(reading, pattern)` renders the accent code of rows that lack one
+    conn = get_db_connection(db_path)
+    try:
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(candidates)")}
+        # Databases built before accent_code was stored get it computed here, once
+        accent_code = "accent_code" if "accent_code" in columns else "NULL"
+        rows = conn.execute(
+            f"SELECT text, reading, accent_pattern, {accent_code} AS accent_code, mora_count "
+            "FROM candidates ORDER BY mora_count, id"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    candidates = []
+    for row in rows:
+        pattern = decode_pattern(row["accent_pattern"])
+        code = row["accent_code"]
+        if code is None:
+            code = visualize(row["reading"], pattern)
+        candidates.append(
+            Candidate(row["text"], row["reading"], pattern, code, row["mora_count"])
+        )
+    return CandidatePool(candidates)
@@ -1,18 +1,61 @@
-from fastapi import FastAPI, HTTPException
+import os
+
+# Must come before numpy is imported (BLAS/OpenMP thread defaults)
+import thread_env
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 import sys
-import os
-import sqlite3
-import json
+import asyncio
+import concurrent.futures
+import queue
 import importlib.util
-from typing import Any, TYPE_CHECKING
+import shutil
+import tempfile
+import logging
+import functools
+from contextlib import asynccontextmanager
+from types import MappingProxyType
+from typing import NamedTuple, Optional, TYPE_CHECKING, Union
+
+import numpy as np
+
+from accent_encoding import (
+    PITCH_LUT,
+    build_lut,
+    codes_to_levels,
+    encode_fields,
+    is_katakana,
+    render_accent,
+)
+from batching import MAX_BATCH_SIZE, MAX_WAIT_MS, AccentBatcher
+from candidates import CandidatePool, load_candidates
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+if os.environ.get("HASHI_DEBUG"):
+    # Verify which BLAS numpy is linked against
+    np.show_config()
 
 from sudachipy import tokenizer
 from sudachipy import dictionary
 
+# We assume 'unidic' package is installed in the env.
+import unidic
+
+# Optional: serve the accent model with onnxruntime (see scripts/export_onnx.py)
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
 # Importing tdmelodic internals from installed package
 try:
-    from tdmelodic.nn.inference import InferAccent
+    from tdmelodic.nn.inference import InferAccent, embed_dim
+    from tdmelodic.nn.net import Net
     from tdmelodic.nn.loader.data_loader import (
         _convert_parsed_surface_to_codes,
         _convert_yomi_to_codes,
@@ -27,17 +70,15 @@ try:
         accent_map,
         accent_align,
     )
-    from chainer.dataset.convert import concat_examples
+    from chainer.serializers import DictionarySerializer
 except ImportError as e:
-    print(f"Error importing tdmelodic: {e}")
+    logger.error(f"Error importing tdmelodic: {e}")
     sys.exit(1)
 
 if TYPE_CHECKING:
 
     class OriginalConverter:
-        def encode_sy(self, surface: str, yomi: str) -> Any: ...
-        def add_batch_dim(self, s: Any, y: Any) -> Any: ...
-        def infer(self, s: Any, l: Any) -> Any: ...
+        pass
 
 else:
     OriginalConverter = object
@@ -45,43 +86,77 @@ else:
 # Dynamically load Converter from vendor submodule
 # because it is missing in the installed package.
 # Also inject tdmelodic.util which is missing in installed package but needed by convert.py
-try:
-    vendor_root = os.path.join(
-        os.path.dirname(__file__), "vendor", "tdmelodic", "tdmelodic"
-    )
+VENDOR_ROOT = os.path.join(os.path.dirname(__file__), "vendor", "tdmelodic", "tdmelodic")
+
+
+def bootstrap_vendor():
+    # Both modules are registered in sys.modules, so this reads and executes the
+    # vendor sources at most once per process, however often main is imported.
+    if "tdmelodic.nn.convert" in sys.modules:
+        return sys.modules["tdmelodic.nn.convert"].Converter
 
     # Packet: tdmelodic.util
-    util_dir = os.path.join(vendor_root, "util")
-    util_init = os.path.join(util_dir, "__init__.py")
-    spec_util = importlib.util.spec_from_file_location("tdmelodic.util", util_init)
-    if spec_util and spec_util.loader:
-        module_util = importlib.util.module_from_spec(spec_util)
-        # Important: Set __path__ so that submodules (like dic_index_map) can be found
-        module_util.__path__ = [util_dir]
-        sys.modules["tdmelodic.util"] = module_util
-        spec_util.loader.exec_module(module_util)
+    if "tdmelodic.util" not in sys.modules:
+        util_dir = os.path.join(VENDOR_ROOT, "util")
+        util_init = os.path.join(util_dir, "__init__.py")
+        spec_util = importlib.util.spec_from_file_location(
+            "tdmelodic.util", util_init
+        )
+        if spec_util and spec_util.loader:
+            module_util = importlib.util.module_from_spec(spec_util)
+            # Important: Set __path__ so that submodules (like dic_index_map) can be found
+            module_util.__path__ = [util_dir]
+            sys.modules["tdmelodic.util"] = module_util
+            spec_util.loader.exec_module(module_util)
 
     # Convert Module
-    convert_path = os.path.join(vendor_root, "nn", "convert.py")
+    convert_path = os.path.join(VENDOR_ROOT, "nn", "convert.py")
     spec = importlib.util.spec_from_file_location("tdmelodic.nn.convert", convert_path)
-    if spec and spec.loader:
-        convert_module = importlib.util.module_from_spec(spec)
+    if not (spec and spec.loader):
+        raise ImportError(f"Cannot load {convert_path}")
+    convert_module = importlib.util.module_from_spec(spec)
+    sys.modules["tdmelodic.nn.convert"] = convert_module
+    try:
         spec.loader.exec_module(convert_module)
-        if not TYPE_CHECKING:
-            OriginalConverter = convert_module.Converter
-except Exception as e:
-    print(f"Error loading tdmelodic submodule: {e}")
-    # Print traceback to help debugging
-    import traceback
+    except BaseException:
+        del sys.modules["tdmelodic.nn.convert"]
+        raise
+    return convert_module.Converter
 
-    traceback.print_exc()
+
+try:
+    if not TYPE_CHECKING:
+        OriginalConverter = bootstrap_vendor()
+except Exception as e:
+    # Log the traceback to help debugging
+    logger.exception(f"Error loading tdmelodic submodule: {e}")
     sys.exit(1)
 
-app = FastAPI()
 
-# Configure CORS
-from fastapi.middleware.cors import CORSMiddleware
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the models (InferAccent, UniDic, Sudachi) off the event loop at startup
+    # instead of at import time, and share them through app.state
+    loop = asyncio.get_running_loop()
+    app.state.converter = await loop.run_in_executor(None, CustomConverter)
+    await loop.run_in_executor(None, app.state.converter.warm_up)
+    try:
+        app.state.candidates = await loop.run_in_executor(
+            None, load_candidates, DB_PATH, app.state.converter.generate_visualization
+        )
+    except Exception:
+        # /api/analyze does not need the DB: serve it anyway, and answer
+        # /api/target-word with 503 until the DB is rebuilt and the app restarted
+        logger.exception(f"Could not load the target words from {DB_PATH}")
+        app.state.candidates = CandidatePool([])
+    yield
+    EXECUTOR.shutdown(wait=False)
+
 
+# orjson serializes the responses much faster than the stdlib json encoder
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Configure CORS
 # In production, this should be set to the actual frontend domain
 # For now, we allow all origins to make development and deployment easier
 origins = [
@@ -108,57 +183,294 @@ class AnalyzeResponse(BaseModel):
     accent_code: str  # Visualization string (e.g. "ハ[シ")
 
 
+class NBest(NamedTuple):
+    # Result of UniDic.get_n_best: parsed candidates, their ranking, and the
+    # Levenshtein distance of the best one to the reference reading
+    parsed: tuple
+    rank: tuple
+    ld: int
+
+
+ROMAN_LUT = build_lut(roman_map)
+ACCENT_LUT = build_lut(accent_map)
+SYMBOL_LUT = build_lut(char_symbol_to_numeric)
+
+
+# kana2roman and _convert_yomi_to_codes are pure functions of the reading, and
+# readings repeat across words (homophones such as 橋/箸/端), so corpus builds
+# hit these caches often. The codes are cached as tuples, which callers only join.
+@functools.lru_cache(maxsize=16384)
+def yomi_to_roman(yomi: str) -> str:
+    return kana2roman(yomi)
+
+
+@functools.lru_cache(maxsize=16384)
+def yomi_to_codes(yomi: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    Y_vow, Y_con = _convert_yomi_to_codes(yomi)
+    return tuple(Y_vow), tuple(Y_con)
+
+
+# ONNX export of the accent model, produced by scripts/export_onnx.py
+ONNX_PATH = os.path.join(os.path.dirname(__file__), "data", "accent.onnx")
+
+
+def load_onnx_session(path: str = ONNX_PATH):
+    # None means "keep using Chainer": onnxruntime missing or model not exported
+    if ort is None or not os.path.exists(path):
+        return None
+    so = ort.SessionOptions()
+    so.intra_op_num_threads = thread_env.omp_num_threads()
+    return ort.InferenceSession(
+        path, sess_options=so, providers=["CPUExecutionProvider"]
+    )
+
+
+# Model weights as one .npy file per parameter/persistent, written on first start
+WEIGHTS_DIR = os.path.join(os.path.dirname(__file__), "data", "accent_weights")
+
+
+class SharedInferAccent(InferAccent):
+    # load_npz copies the weights into private memory in every process.
+    # Memory-mapping them read-only instead lets all uvicorn and build_db.py
+    # worker processes share one page-cache copy.
+
+    def __init__(self, weights_dir: str = WEIGHTS_DIR):
+        if os.path.isdir(weights_dir):
+            self.net = Net(embed_dim=embed_dim)
+        else:
+            super().__init__()  # Downloads the model if needed and loads the npz
+            self.save_weights(weights_dir)
+        self.map_weights(weights_dir)
+
+    def save_weights(self, weights_dir: str):
+        serializer = DictionarySerializer()
+        serializer.save(self.net)
+        # Write to a temporary directory and rename it, so that concurrently
+        # starting workers never map a half-written directory
+        tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(weights_dir))
+        for key, value in serializer.target.items():
+            np.save(os.path.join(tmp_dir, key.replace("/", ".") + ".npy"), value)
+        try:
+            os.rename(tmp_dir, weights_dir)
+        except OSError:  # Another worker got there first
+            shutil.rmtree(tmp_dir)
+
+    def map_weights(self, weights_dir: str):
+        links = dict(self.net.namedlinks())
+        for filename in os.listdir(weights_dir):
+            path, _, name = filename[: -len(".npy")].replace(".", "/").rpartition("/")
+            link = links["/" + path]
+            array = np.load(os.path.join(weights_dir, filename), mmap_mode="r")
+            if name in link._params:
+                getattr(link, name).array = array
+            else:
+                # Persistents: BatchRenormalization statistics, plus scalars such as N
+                value = getattr(link, name)
+                if not isinstance(value, np.ndarray):
+                    array = type(value)(array)
+                setattr(link, name, array)
+
+
 class CustomConverter(OriginalConverter):
-    def __init__(self):
+    def __init__(
+        self, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS
+    ):
         # Do not call super().__init__() because it crashes trying to find default mecabrc
         # Instead, we manually initialize what the parent would have, but with CORRECT arguments.
-        self.model = InferAccent()
+        self.model = SharedInferAccent()
 
         # Override UniDic to use OUR custom mecabrc
-        # We assume 'unidic' package is installed in the env.
-        import unidic
-
         self.unidic = UniDic(unidic_path=unidic.DICDIR, mecabrc_path="mecabrc")
 
-        # Initialize Sudachi for robust readings
+        # Initialize Sudachi for readings of words UniDic does not know
         self.sudachi_dict = dictionary.Dictionary(dict="small")
         self.mode = tokenizer.Tokenizer.SplitMode.C
 
-    def generate_visualization(self, reading: str, pattern: list[int]) -> str:
-        morae = sep_katakana2mora(reading)
-        display_str = ""
-        for i, (m, p) in enumerate(zip(morae, pattern)):
-            prefix = ""
-            suffix = ""
-            if p == 2:  # High
-                if i == 0 or pattern[i - 1] == 1:
-                    if i > 0:
-                        prefix = "["
-            if p == 2:
-                if i + 1 < len(pattern) and pattern[i + 1] == 1:
-                    suffix = "]"
-            display_str += prefix + m + suffix
-        return display_str
+        # A Sudachi tokenizer must not be used by two threads at once
+        # (RuntimeError: Already borrowed), so each call borrows one from a pool.
+        # The pool only grows when every tokenizer is busy: at low concurrency a
+        # single long-lived tokenizer serves every call.
+        self._tok_pool: queue.SimpleQueue = queue.SimpleQueue()
+        self._tok_pool.put(self.sudachi_dict.create())
+
+        # The Chainer model is not thread-safe: inference is funneled through
+        # one batching thread, so tokenization and dictionary lookups can
+        # still run in parallel.
+        self.batcher = AccentBatcher(
+            self.model,
+            session=load_onnx_session(),
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+        )
+
+        # The pipeline is deterministic in `text`, so results are memoized per instance
+        self._cache = functools.lru_cache(maxsize=4096)(self._convert_impl)
+
+        # The only MeCab memo under _cache: get_reading and _prepare both need the
+        # 1-best parse of the same text within one convert, so it only has to
+        # outlive that (and one scripts/build_db.py batch, whose mora filter
+        # reads every noun before converting them). A repeated text hits _cache
+        # first, so a larger memo would mostly duplicate its entries.
+        self._1best_cache = functools.lru_cache(maxsize=1024)(self._get_1best_impl)
+
+    def get_n_best(self, surface: str, yomi: str) -> NBest:
+        # Not memoized: only encode_sy calls it, once per _cache miss
+        parsed, rank, ld = self.unidic.get_n_best(surface, yomi)
+        return NBest(tuple(parsed), tuple(rank), ld)
+
+    def get_1best(self, surface: str) -> tuple:
+        return self._1best_cache(surface)
+
+    def _get_1best_impl(self, surface: str) -> tuple:
+        # MeCab's 1-best (Viterbi) parse, which heads the n-best list: far cheaper
+        # than enumerating 20 parses, and all that the reading and the dictionary
+        # accent lookup need. Empty when MeCab returns no parse.
+        try:
+            parsed, _, _ = self.unidic.get_n_best(surface, "", nbest=1)
+        except IndexError:
+            return ()
+        return tuple(parsed[0])
+
+    def encode_sy(self, surface: str, yomi: str):
+        # Same encoding as tdmelodic's data loader (inference mode),
+        # but each sequence is mapped to codes with a single LUT gather.
+        lst_mecab_parsed, rank, ld = self.get_n_best(surface, yomi)
+        mecab_parsed = lst_mecab_parsed[rank[0]]
+
+        return encode_fields(
+            _convert_parsed_surface_to_codes(mecab_parsed),
+            yomi_to_codes(yomi),
+            ROMAN_LUT,
+            ACCENT_LUT,
+            SYMBOL_LUT,
+        )
+
+    def warm_up(self, text: str = "橋"):
+        # The first forward pass and MeCab lookup pay one-off setup costs:
+        # pay them at startup instead of on the first fallback request
+        s_np, y_np = self.encode_sy(normalize_jpn(text), self.get_reading(text))
+        self.batcher.infer(s_np, y_np)
+
+    def get_reading(self, text: str, sudachi_reading: Optional[str] = None) -> str:
+        # Read yomi off UniDic's 1-best parse (MeCab already runs for the accent lookup),
+        # and only fall back to Sudachi when MeCab has no usable reading.
+        # Callers that already tokenized `text` can pass Sudachi's reading.
+        yomi = self.get_unidic_reading(normalize_jpn(text))
+        if yomi:
+            return yomi
+        if sudachi_reading is None:
+            sudachi_reading = self.get_sudachi_reading(text)
+        return sudachi_reading
+
+    def get_unidic_reading(self, surface: str) -> str:
+        # The kana form (トウキョウ) is the notation of Sudachi's readings and of
+        # candidates.db. The pronunciation (トーキョー) only stands in for tokens
+        # without a katakana kana field.
+        kanas = []
+        for m in self.get_1best(surface):
+            kana = m.get("kana")
+            if not (kana and is_katakana(kana)):
+                kana = m.get("pron")
+            if not (kana and is_katakana(kana)):
+                # Unknown words come back with "*" or surface-form readings
+                return ""
+            kanas.append(kana)
+        return "".join(kanas)
+
+    def get_sudachi_reading(self, text: str) -> str:
+        try:
+            tokenizer_instance = self._tok_pool.get_nowait()
+        except queue.Empty:
+            tokenizer_instance = self.sudachi_dict.create()
+        try:
+            tokens = tokenizer_instance.tokenize(text, self.mode)
+            return "".join(m.reading_form() for m in tokens)
+        finally:
+            self._tok_pool.put(tokenizer_instance)
+
+    def generate_visualization(
+        self,
+        reading: str,
+        pattern: Union[list[int], np.ndarray],
+        morae: Optional[list[str]] = None,
+    ) -> str:
+        # Callers that already segmented the reading can pass `morae` to skip doing it again
+        if morae is None:
+            morae = sep_katakana2mora(reading)
+        return render_accent(morae, pattern)
 
     def convert(self, text: str):
+        return self._cache(text)
+
+    def convert_batch(self, texts: list[str], sudachi_readings=None) -> list:
+        # Batch version of convert for offline use (scripts/build_db.py): the texts that
+        # need the ML fallback are encoded first and then submitted to the batcher
+        # together, so they share forward passes. The batcher only stacks inputs of
+        # equal length (no padding), so each word gets the same prediction as from
+        # convert / /api/analyze. Texts that cannot be analyzed come
+        # back as None. `sudachi_readings` (one per text) saves tokenizing again
+        # when the Sudachi reading fallback is needed.
+        if sudachi_readings is None:
+            sudachi_readings = [None] * len(texts)
+        results: list = [None] * len(texts)
+        pending = []
+        for i, (text, sudachi_reading) in enumerate(zip(texts, sudachi_readings)):
+            try:
+                surface, yomi, morae, acc_kernel_str = self._prepare(
+                    text, sudachi_reading
+                )
+                if acc_kernel_str is not None:
+                    levels = self._dictionary_levels(yomi, acc_kernel_str)
+                    results[i] = self._finish(text, yomi, morae, levels)
+                else:
+                    encoded = self.encode_sy(surface, yomi)
+                    pending.append((i, text, yomi, morae, encoded))
+            except Exception:
+                continue
+
+        # Submit in length order, so that equal-length inputs land in the same
+        # collection windows and the batcher's groups stay large
+        pending.sort(key=lambda p: (len(p[4][0][0]), len(p[4][1][0])))
+        futures = [self.batcher.submit(*encoded) for *_, encoded in pending]
+        for (i, text, yomi, morae, _), future in zip(pending, futures):
+            try:
+                levels = codes_to_levels(future.result())
+                results[i] = self._finish(text, yomi, morae, levels)
+            except Exception:
+                continue
+        return results
+
+    def _convert_impl(self, text: str):
+        surface, yomi, morae, acc_kernel_str = self._prepare(text)
+
+        if acc_kernel_str is not None:
+            levels = self._dictionary_levels(yomi, acc_kernel_str)
+        else:
+            # ML Fallback: the only path that encodes surface/yomi into model inputs
+            s_np, y_np = self.encode_sy(surface, yomi)
+            codes = self.batcher.infer(s_np, y_np)
+
+            # Convert valid tdmelodic codes (0=], 1=, 2=[) to Pitch Levels (1=L, 2=H)
+            levels = codes_to_levels(codes)
+
+        return self._finish(text, yomi, morae, levels)
+
+    def _prepare(self, text: str, sudachi_reading: Optional[str] = None):
         # 1. Normalize (Standard step, though encode_sy also does some)
         surface = normalize_jpn(text)
 
-        # 2. Sudachi Analysis for Yomi
-        # Create tokenizer per request to ensure thread safety (avoids RuntimeError: Already borrowed)
-        tokenizer_instance = self.sudachi_dict.create()
-        tokens = tokenizer_instance.tokenize(text, self.mode)
-        yomi = "".join([m.reading_form() for m in tokens])
+        # 2. Yomi (UniDic, with Sudachi as fallback)
+        yomi = self.get_reading(text, sudachi_reading)
+        morae = sep_katakana2mora(yomi)
 
         # 3. UniDic Analysis & Dictionary Accent Check
         # We need to manually check for the dictionary kernel because encode_sy doesn't return it.
-        tmp = self.unidic.get_n_best(surface, yomi)
-        if not tmp:
+        # The 1-best parse is enough here (and already cached by get_reading): only
+        # encode_sy, on the ML fallback path, enumerates the n-best parses.
+        mecab_parsed = self.get_1best(surface)
+        if not mecab_parsed:
             raise HTTPException(status_code=400, detail="Could not analyze text")
 
-        lst_mecab_parsed, rank, ld = tmp
-        mecab_parsed = lst_mecab_parsed[0]
-
         acc_kernel_str = None
         if len(mecab_parsed) == 1:
             acc_kernel_str = mecab_parsed[0].get("acc")
@@ -166,112 +478,89 @@ class CustomConverter(OriginalConverter):
             if acc_kernel_str and "," in acc_kernel_str:
                 acc_kernel_str = acc_kernel_str.split(",")[0]
 
-        preds = []
-        current_level = 1  # Default initialization
-
-        if acc_kernel_str and acc_kernel_str.isdigit():
-            # Dictionary Fast Path
-            kernel = int(acc_kernel_str)
-            roman = kana2roman(yomi)
-            acc_str_full = accent_align(roman, str(kernel))
-            acc_str = acc_str_full[0::2]
-            preds = [1 if c == "L" else 2 if c == "H" else 0 for c in acc_str]
-            if preds:
-                current_level = preds[-1]
-        else:
-            # ML Fallback using Parent Logic
-            # We use parent methods to ensure consistency with library implementation
-            if hasattr(self, "encode_sy"):  # Runtime check or trust the flow
-                s_np, y_np = self.encode_sy(surface, yomi)
-                s_np, y_np = self.add_batch_dim(s_np, y_np)
-                codes = self.infer(s_np, y_np).tolist()[0]
-
-                # Convert valid tdmelodic codes (0=], 1=, 2=[) to Pitch Levels (1=L, 2=H)
-                current_level = 2 if (len(codes) > 0 and codes[0] == 0) else 1
-                preds = []
-                for c in codes:
-                    preds.append(current_level)
-                    if c == 2:  # Rise -> Next H
-                        current_level = 2
-                    elif c == 0:  # Fall -> Next L
-                        current_level = 1
-                    # c==1 -> Next same as current
-            else:
-                # Should not happen if initialization worked
-                raise HTTPException(
-                    status_code=500, detail="Model not initialized correctly"
-                )
+        # Only a digit kernel can take the dictionary fast path
+        if not (acc_kernel_str and acc_kernel_str.isdigit()):
+            acc_kernel_str = None
+
+        return surface, yomi, morae, acc_kernel_str
+
+    def _dictionary_levels(self, yomi: str, acc_kernel_str: str) -> np.ndarray:
+        # Dictionary Fast Path: none of the model input encoding is needed
+        # (accent_align parses the digit kernel string itself)
+        roman = yomi_to_roman(yomi)
+        acc_str_full = accent_align(roman, acc_kernel_str)
+        # Two characters per mora: take every other byte as a strided view
+        acc_buf = np.frombuffer(acc_str_full.encode("ascii"), dtype=np.uint8)
+        preds_arr = PITCH_LUT[acc_buf[0::2]]
+        # Same layout as codes_to_levels: the last level is the one used for padding
+        return np.concatenate((preds_arr, preds_arr[-1:] if len(preds_arr) else [1]))
+
+    def _finish(self, text: str, yomi: str, morae: list[str], levels: np.ndarray):
+        # `levels` holds one pitch level per predicted mora plus the level to pad with
+        preds_arr, current_level = levels[:-1], levels[-1]
 
         # 6. Post-process trimming
-        morae = sep_katakana2mora(yomi)
-        preds = preds[: len(morae)]
-        if len(preds) < len(morae):
-            preds += [current_level] * (len(morae) - len(preds))
+        preds_arr = preds_arr[: len(morae)]
+        if len(preds_arr) < len(morae):
+            padding = np.full(len(morae) - len(preds_arr), current_level, np.uint8)
+            preds_arr = np.concatenate((preds_arr, padding))
 
         # 7. Visualization
-        display_str = self.generate_visualization(yomi, preds)
+        display_str = self.generate_visualization(yomi, preds_arr, morae)
 
-        return {
-            "text": text,
-            "reading": yomi,
-            "accent_pattern": preds,
-            "accent_code": display_str,
-        }
+        # Read-only view, since the same object is shared by every cache hit
+        return MappingProxyType(
+            {
+                "text": text,
+                "reading": yomi,
+                # Single conversion to Python ints, at the very end
+                "accent_pattern": preds_arr.tolist(),
+                "accent_code": display_str,
+            }
+        )
 
 
-converter = CustomConverter()
+# Bounded pool for the CPU-bound analysis pipeline (Sudachi, MeCab, inference)
+EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count())
 
 
 # DB Setup
 DB_PATH = os.path.join(os.path.dirname(__file__), "data", "candidates.db")
 
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
 @app.get("/")
 def read_root():
     return {"status": "ok", "service": "tdmelodic-api"}
 
 
 @app.post("/api/analyze", response_model=AnalyzeResponse)
-def analyze(request: AnalyzeRequest):
-    return converter.convert(request.text)
+async def analyze(body: AnalyzeRequest, request: Request):
+    converter = request.app.state.converter
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(EXECUTOR, converter.convert, body.text)
 
 
 @app.get("/api/target-word", response_model=AnalyzeResponse)
-def get_target_word(min_mora: int = 2, max_mora: int = 8):
-    conn = get_db_connection()
-    try:
-        # Get random word within mora range
-        # SQLite ORDER BY RANDOM() is okay for small datasets
-        row = conn.execute(
-            "SELECT * FROM candidates WHERE mora_count >= ? AND mora_count <= ? ORDER BY RANDOM() LIMIT 1",
-            (min_mora, max_mora),
-        ).fetchone()
-
-        if not row:
-            raise HTTPException(
-                status_code=404, detail="No words found for this difficulty"
-            )
-
-        accent_pattern = json.loads(row["accent_pattern"])
-        accent_code = converter.generate_visualization(row["reading"], accent_pattern)
-
-        return {
-            "text": row["text"],
-            "reading": row["reading"],
-            "accent_pattern": accent_pattern,
-            "accent_code": accent_code,
-        }
-    finally:
-        conn.close()
+async def get_target_word(request: Request, min_mora: int = 2, max_mora: int = 8):
+    candidates = request.app.state.candidates
+    if not candidates.candidates:
+        raise HTTPException(status_code=503, detail="Target words are unavailable")
+
+    # Get random word within mora range (served from memory, see CandidatePool)
+    candidate = candidates.pick(min_mora, max_mora)
+
+    if candidate is None:
+        raise HTTPException(status_code=404, detail="No words found for this difficulty")
+
+    return {
+        "text": candidate.text,
+        "reading": candidate.reading,
+        "accent_pattern": candidate.accent_pattern,
+        "accent_code": candidate.accent_code,
+    }
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
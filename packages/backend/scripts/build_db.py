@@ -2,17 +2,21 @@ import sys
 import os
 import sqlite3
 import argparse
+import concurrent.futures
 
 # Setup paths
 BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, BACKEND_DIR)
 
+# BLAS/OpenMP thread defaults: must come before anything imports numpy
+import thread_env  # noqa: E402, F401
+
+from sudachipy import tokenizer  # noqa: E402
+from tdmelodic.nn.lang.japanese.kana.mora_sep import sep_katakana2mora  # noqa: E402
+
 # Import CustomConverter from main
-# Note: This requires main.py to be importable or refactored.
-# For now, we will duplicate the setup logic or import it if safe (main.py creates app on import).
-# safest is to import converter instance if possible, or replicate the class.
-# Given main.py creates 'app' and 'converter' at module level, importing it might start side effects,
-# but inside a script we can handle it.
+# Importing main creates the FastAPI app, but the models are only loaded
+# by the app's lifespan (or when we construct CustomConverter below).
 try:
     from main import CustomConverter
 except ImportError:
@@ -23,66 +27,158 @@ except ImportError:
 
 def setup_db(db_path):
     conn = sqlite3.connect(db_path)
+    # Bulk-load settings: the DB is rebuilt from scratch, so durability per write is not needed
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
     c = conn.cursor()
+    # `db_path` is a fresh file (see main), so the table always has the current schema
     c.execute("""
-        CREATE TABLE IF NOT EXISTS candidates (
+        CREATE TABLE candidates (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             text TEXT UNIQUE,
             reading TEXT,
-            accent_pattern TEXT, -- JSON string
+            accent_pattern BLOB, -- one byte per mora (1=L, 2=H)
+            accent_code TEXT, -- generate_visualization output, e.g. セ]カイ
             mora_count INTEGER
         )
     """)
-    c.execute("CREATE INDEX IF NOT EXISTS idx_mora ON candidates(mora_count)")
+    c.execute("CREATE INDEX idx_mora ON candidates(mora_count)")
     conn.commit()
     return conn
 
 
-def align_and_validate(converter, text):
-    try:
-        result = converter.convert(text)
-        reading = result["reading"]
-        pattern = result["accent_pattern"]
-
-        # Validations
-        if not reading:
-            return None
-        # Must be mostly katakana reading
-        # Check constraints: 2 <= mora <= 10
-        mora_count = len(pattern)
-        if mora_count < 2 or mora_count > 10:
-            return None
-
-        return {
-            "text": text,
-            "reading": reading,
-            "accent_pattern": str(pattern),
-            "mora_count": mora_count,
-        }
-    except Exception:
-        # print(f"Skipping {text}: {e}")
-        return None
+# Words converted per convert_batch call (ML fallback words share forward passes)
+BATCH_SIZE = 100
+# Batching window for convert_batch, which submits a whole batch at once and in
+# length order: unlike the server (no window by default), it has no latency to lose
+BATCH_WAIT_MS = 10
+# Rows buffered before each executemany (one transaction per flush)
+INSERT_BATCH_SIZE = 500
 
+# INSERT OR IGNORE already skips duplicate texts (UNIQUE constraint)
+INSERT_SQL = """
+    INSERT OR IGNORE INTO candidates (text, reading, accent_pattern, accent_code, mora_count)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
+def insert_rows(conn, rows):
+    # Returns the number of rows actually inserted
+    with conn:
+        return conn.executemany(INSERT_SQL, rows).rowcount
 
-def is_noun_via_sudachi(text, converter):
-    """Check if a word is a noun using Sudachi tokenization"""
-    try:
-        from sudachipy import tokenizer, dictionary
 
-        dic = dictionary.Dictionary(dict="small")
-        tok = dic.create()
-        tokens = tok.tokenize(text, tokenizer.Tokenizer.SplitMode.C)
+# Accepted word length, in morae
+MIN_MORA = 2
+MAX_MORA = 10
 
-        # Check if single token and is a noun
-        if len(tokens) != 1:
-            return False
 
-        pos = tokens[0].part_of_speech()
-        # POS format: [品詞大分類, 品詞中分類, ...]
-        # 名詞 is the main noun category
-        return pos[0] == "名詞" if pos else False
+def align_and_validate(result):
+    # `result` is one entry of CustomConverter.convert_batch (None if analysis failed)
+    if result is None:
+        return None
+    reading = result["reading"]
+    pattern = result["accent_pattern"]
+
+    # Validations
+    if not reading:
+        return None
+    # Must be mostly katakana reading
+    # Check constraints: MIN_MORA <= mora <= MAX_MORA
+    mora_count = len(pattern)
+    if mora_count < MIN_MORA or mora_count > MAX_MORA:
+        return None
+
+    return {
+        "text": result["text"],
+        "reading": reading,
+        # Levels are 1 or 2, so each fits in one byte
+        "accent_pattern": bytes(pattern),
+        # Stored so that /api/target-word does not redo the visualization per request
+        "accent_code": result["accent_code"],
+        "mora_count": mora_count,
+    }
+
+
+def tokenize(tok, text):
+    try:
+        return tok.tokenize(text, tokenizer.Tokenizer.SplitMode.C)
     except Exception:
-        return False
+        return []
+
+
+def is_noun_via_sudachi(tokens, is_noun):
+    """Check if a word is a noun from its Sudachi tokens"""
+    # Check if single token and is a noun
+    # is_noun is a PosMatcher: it compares POS ids instead of building
+    # the POS string tuple ([品詞大分類, 品詞中分類, ...]) per word
+    return len(tokens) == 1 and is_noun(tokens[0])
+
+
+def in_mora_range(reading):
+    """Mora bound on the reading that will be stored, checked before the accent analysis"""
+    # The stored pattern has one level per mora of this reading, so out-of-range
+    # words are dropped exactly as align_and_validate would, but before going
+    # through MeCab n-best and possibly the model
+    mora_count = len(sep_katakana2mora(reading))
+    return MIN_MORA <= mora_count <= MAX_MORA
+
+
+# Per-process state, set up once by init_worker
+_worker = None
+
+
+def init_worker():
+    # Each worker process loads its own converter (models, UniDic, Sudachi)
+    global _worker
+    converter = CustomConverter(max_batch_size=BATCH_SIZE, max_wait_ms=BATCH_WAIT_MS)
+    # Reuse the converter's Sudachi dictionary instead of loading one per word
+    tok = converter.sudachi_dict.create()
+    # 名詞 is the main noun category
+    is_noun = converter.sudachi_dict.pos_matcher(lambda pos: pos[0] == "名詞")
+    _worker = (converter, tok, is_noun)
+
+
+def process_batch(batch):
+    # Runs in a worker: returns (number of nouns, DB rows) for one batch of words
+    converter, tok, is_noun = _worker
+
+    # Filter 1: Must be a noun (via Sudachi POS tagging)
+    # Each word is tokenized once. The Sudachi reading is only read off for nouns
+    # (a single token), and reused as the reading fallback.
+    n_nouns = 0
+    nouns = []
+    noun_readings = []
+    for word in batch:
+        tokens = tokenize(tok, word)
+        if not is_noun_via_sudachi(tokens, is_noun):
+            continue
+        n_nouns += 1
+        sudachi_reading = tokens[0].reading_form()
+        # The reading convert_batch will use (usually UniDic's): its 1-best
+        # parse stays memoized for the conversion below
+        if in_mora_range(converter.get_reading(word, sudachi_reading)):
+            nouns.append(word)
+            noun_readings.append(sudachi_reading)
+
+    # Filter 2: Validate accent analysis (mora count constraints, etc.)
+    # Words whose reading is already out of range never reach convert_batch
+    rows = []
+    for result in converter.convert_batch(nouns, noun_readings):
+        data = align_and_validate(result)
+        if not data:
+            continue
+        rows.append(
+            (
+                data["text"],
+                data["reading"],
+                data["accent_pattern"],
+                data["accent_code"],
+                data["mora_count"],
+            )
+        )
+    return n_nouns, rows
 
 
 def main():
@@ -113,23 +209,33 @@ Examples:
         default=os.path.join(BACKEND_DIR, "data", "candidates.db"),
         help="Output database path. Default: data/candidates.db",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Worker processes, each loading its own models. Default: number of CPUs",
+    )
 
     args = parser.parse_args()
 
     corpus_path = args.corpus
     db_path = args.output
 
-    conn = setup_db(db_path)
-    converter = CustomConverter()
-
     print(f"Building dictionary from corpus: {corpus_path}")
 
-    # Load corpus file
+    # Load corpus file (before touching any database)
     if not os.path.exists(corpus_path):
         print(f"Error: Corpus file not found at {corpus_path}")
         print("Please provide a valid corpus file path.")
         return
 
+    # Build into a temporary file and only move it over `db_path` once it is
+    # complete: a failed or interrupted build leaves the existing DB untouched
+    tmp_path = db_path + ".tmp"
+    for leftover in (tmp_path, tmp_path + "-wal", tmp_path + "-shm"):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
     print(f"Loading corpus from {corpus_path}...")
     with open(corpus_path, "r", encoding="utf-8") as f:
         candidates = [line.strip() for line in f if line.strip()]
@@ -137,50 +243,44 @@ Examples:
 
     print(f"Processing {len(candidates)} unique candidates...")
 
-    cursor = conn.cursor()
+    rows = []
     count_total = 0
     count_nouns = 0
     count_valid = 0
 
-    for idx, word in enumerate(candidates):
-        if idx % 1000 == 0 and idx > 0:
-            print(
-                f"  Processed {idx}/{len(candidates)} words... ({count_valid} valid nouns added)"
-            )
-
-        count_total += 1
-
-        # Filter 1: Must be a noun (via Sudachi POS tagging)
-        if not is_noun_via_sudachi(word, converter):
-            continue
-
-        count_nouns += 1
-
-        # Filter 2: Validate accent analysis (mora count constraints, etc.)
-        data = align_and_validate(converter, word)
-        if not data:
-            continue
-
-        # Insert into DB
-        try:
-            cursor.execute(
-                """
-                INSERT OR IGNORE INTO candidates (text, reading, accent_pattern, mora_count)
-                VALUES (?, ?, ?, ?)
-            """,
-                (
-                    data["text"],
-                    data["reading"],
-                    data["accent_pattern"],
-                    data["mora_count"],
-                ),
-            )
-            count_valid += 1
-        except sqlite3.IntegrityError:
-            pass
-
-    conn.commit()
+    batches = [
+        candidates[start : start + BATCH_SIZE]
+        for start in range(0, len(candidates), BATCH_SIZE)
+    ]
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.workers, initializer=init_worker
+    ) as executor:
+        # map keeps corpus order, so frequency-ordered ids are preserved.
+        # It submits every batch up front, which starts all the worker processes:
+        # the connection is only opened afterwards, so no forked worker inherits it.
+        results = executor.map(process_batch, batches)
+        conn = setup_db(tmp_path)
+        for batch, (n_nouns, batch_rows) in zip(batches, results):
+            if count_total % 1000 == 0 and count_total > 0:
+                print(
+                    f"  Processed {count_total}/{len(candidates)} words... ({count_valid} valid nouns added)"
+                )
+
+            count_total += len(batch)
+            count_nouns += n_nouns
+
+            # Insert into DB
+            rows.extend(batch_rows)
+            if len(rows) >= INSERT_BATCH_SIZE:
+                count_valid += insert_rows(conn, rows)
+                rows = []
+
+    if rows:
+        count_valid += insert_rows(conn, rows)
+    # Leave a single self-contained file behind (no -wal/-shm side files)
+    conn.execute("PRAGMA journal_mode=DELETE")
     conn.close()
+    os.replace(tmp_path, db_path)
 
     print("\n" + "=" * 60)
     print("Database build complete!")
@@ -0,0 +1,109 @@
+import sys
+import os
+import argparse
+
+# Setup paths
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# BLAS/OpenMP thread defaults: must come before numpy and chainer are imported
+import thread_env  # noqa: E402, F401
+
+import numpy as np  # noqa: E402
+import chainer  # noqa: E402
+import chainer.functions as F  # noqa: E402
+from chainer.dataset.convert import concat_examples  # noqa: E402
+from tdmelodic.nn.loader.data_loader import normalize_jpn  # noqa: E402
+
+# Optional dependencies:
+#   pip install -r requirements-onnx.txt
+import onnx  # noqa: E402
+import onnx_chainer  # noqa: E402
+import onnxruntime as ort  # noqa: E402
+
+from batching import ONNX_INPUT_NAMES, ONNX_OUTPUT_NAME  # noqa: E402
+from main import CustomConverter  # noqa: E402
+
+# Words used to trace the graph and to check the exported model against Chainer.
+# They deliberately have different lengths so the symbolic axes get exercised.
+SAMPLE_WORDS = ["橋", "東京タワー", "トリケラトプス", "国立国会図書館"]
+
+
+class ExportNet(chainer.Chain):
+    # Flat-argument wrapper around tdmelodic's Net, returning accent codes only
+
+    def __init__(self, net):
+        super().__init__()
+        with self.init_scope():
+            self.net = net
+
+    def __call__(self, s_vow, s_con, s_pos, s_acc, s_acccon, s_gosh, y_vow, y_con):
+        X_s = (s_vow, s_con, s_pos, s_acc, s_acccon, s_gosh)
+        X_y = (y_vow, y_con)
+        h, _ = self.net(X_s, X_y, y_vow * 0)
+        return F.argmax(h, axis=1)
+
+
+def encode_batch(converter, words):
+    items = []
+    for word in words:
+        surface = normalize_jpn(word)
+        s_np, y_np = converter.encode_sy(surface, converter.get_reading(word))
+        items.append(s_np + y_np)
+    return concat_examples(items, device=-1, padding=0)
+
+
+def make_axes_symbolic(model_proto):
+    # onnx_chainer traces fixed shapes: free the batch and sequence axes
+    for value in list(model_proto.graph.input) + list(model_proto.graph.output):
+        dims = value.type.tensor_type.shape.dim
+        seq_axis = "s_len" if value.name.startswith("s_") else "y_len"
+        dims[0].dim_param = "batch"
+        dims[1].dim_param = seq_axis
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export the tdmelodic accent model to ONNX for onnxruntime serving"
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=os.path.join(BACKEND_DIR, "data", "accent.onnx"),
+        help="Output model path. Default: data/accent.onnx",
+    )
+    args = parser.parse_args()
+
+    converter = CustomConverter()
+    export_net = ExportNet(converter.model.net)
+
+    batch = encode_batch(converter, SAMPLE_WORDS)
+    with chainer.using_config("train", False):
+        model_proto = onnx_chainer.export(
+            export_net,
+            list(batch),
+            input_names=ONNX_INPUT_NAMES,
+            output_names=[ONNX_OUTPUT_NAME],
+        )
+    make_axes_symbolic(model_proto)
+    onnx.checker.check_model(model_proto)
+
+    # Refuse to write a model that disagrees with Chainer on other shapes
+    session = ort.InferenceSession(
+        model_proto.SerializeToString(), providers=["CPUExecutionProvider"]
+    )
+    for words in ([SAMPLE_WORDS[0]], SAMPLE_WORDS[1:], SAMPLE_WORDS):
+        batch = encode_batch(converter, words)
+        X_s, X_y = batch[:-2], batch[-2:]
+        expected = converter.model.infer(X_s, X_y, X_y[0] * 0)
+        actual = session.run(None, dict(zip(ONNX_INPUT_NAMES, batch)))[0]
+        if not np.array_equal(np.asarray(expected), actual):
+            print(f"Error: ONNX output differs from Chainer for {words}")
+            sys.exit(1)
+
+    onnx.save(model_proto, args.output)
+    print(f"Exported accent model to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from accent_encoding import (  # noqa: E402
+    build_lut,
+    codes_to_levels,
+    encode_fields,
+    render_accent,
+)
+
+
+def loop_levels(codes):
+    # The per-element loop codes_to_levels replaced: the level before each code,
+    # plus the level left over after the last one (used to pad the pattern)
+    current_level = 2 if (len(codes) > 0 and codes[0] == 0) else 1
+    preds = []
+    for c in codes:
+        preds.append(current_level)
+        if c == 2:  # Rise -> Next H
+            current_level = 2
+        elif c == 0:  # Fall -> Next L
+            current_level = 1
+    return preds + [current_level]
+
+
+@pytest.mark.parametrize(
+    "codes",
+    [
+        [],
+        [1],
+        [0],
+        [2],
+        [1, 1, 1],  # No change at all
+        [1, 1, 2, 1, 1],  # Leading "no change" before a rise
+        [1, 0, 1, 1],  # Leading "no change" before a fall
+        [0, 1, 1, 2, 1, 0],  # Starts high, consecutive "no change"
+        [2, 1, 1, 1, 0, 1, 1],
+        [2, 2, 0, 0, 1, 2],
+    ],
+)
+def test_codes_to_levels_matches_loop(codes):
+    levels = codes_to_levels(np.array(codes, dtype=np.int32))
+    assert levels.tolist() == loop_levels(codes)
+
+
+def test_codes_to_levels_matches_loop_on_random_codes():
+    rng = np.random.RandomState(0)
+    for length in range(1, 16):
+        for _ in range(20):
+            codes = rng.randint(0, 3, length)
+            assert codes_to_levels(codes).tolist() == loop_levels(codes.tolist())
+
+
+@pytest.fixture
+def tdm():
+    # Only tdmelodic's pure-Python maps are needed here; its data loader itself
+    # imports Chainer and MeCab, so its encoding steps are reproduced below
+    pytest.importorskip("tdmelodic")
+    from tdmelodic.nn.lang.category import symbol_map
+    from tdmelodic.nn.lang.japanese.accent.accent_alignment import (
+        accent_align,
+        accent_map,
+    )
+    from tdmelodic.nn.lang.japanese.accent.accent_diff import simple_accent_diff
+    from tdmelodic.nn.lang.japanese.kana.kana2roman import kana2roman
+    from tdmelodic.nn.lang.japanese.kana.kanamap.kanamap_normal import roman_map
+
+    return SimpleNamespace(
+        symbol_map=symbol_map,
+        accent_align=accent_align,
+        accent_map=accent_map,
+        simple_accent_diff=simple_accent_diff,
+        kana2roman=kana2roman,
+        roman_map=roman_map,
+        luts=(
+            build_lut(roman_map),
+            build_lut(accent_map),
+            build_lut(symbol_map.char_symbol_to_numeric),
+        ),
+    )
+
+
+def surface_codes(tdm, morphemes):
+    # tdmelodic's _convert_parsed_surface_to_codes, on (pron, pos, goshu, acc, concat)
+    sm = tdm.symbol_map
+
+    def category(mapper, index):
+        return [
+            sm.numeric_to_char_symbol[mapper(m[index])] * len(w)
+            for m, w in zip(morphemes, pron_code)
+        ]
+
+    pron_code = [tdm.kana2roman(m[0]) for m in morphemes]
+    acc_code = [tdm.accent_align(y, m[3]) for y, m in zip(pron_code, morphemes)]
+    pos_code = category(sm.pos_map_robust, 1)
+    conc_code = category(sm.acccon_map_robust, 4)
+    gosh_code = category(sm.goshu_map_robust, 2)
+    return (
+        [w[0::2] for w in pron_code],
+        [w[1::2] for w in pron_code],
+        [tdm.simple_accent_diff(a[0::2]) for a in acc_code],
+        [a[0::2] for a in pos_code],
+        [a[0::2] for a in conc_code],
+        [a[0::2] for a in gosh_code],
+    )
+
+
+def yomi_codes(tdm, kana):
+    # tdmelodic's _convert_yomi_to_codes
+    roman = tdm.kana2roman(kana)
+    return [roman[0::2]], [roman[1::2]]
+
+
+def loader_encode(tdm, s_codes, y_codes):
+    # The join / pad / per-character map steps of tdmelodic's data loader
+    S_vow, S_con, S_acc, S_pos, S_acccon, S_gosh = s_codes
+    Y_vow, Y_con = y_codes
+    S_vow = "".join([s + " " for s in S_vow])
+    S_con = "".join([s + " " for s in S_con])
+    S_acc = "".join([s for s in S_acc])
+    S_pos = "".join([s + " " for s in S_pos])
+    S_acccon = "".join([s + " " for s in S_acccon])
+    S_gosh = "".join([s + " " for s in S_gosh])
+    Y_vow = "".join([s + " " for s in Y_vow])
+    Y_con = "".join([s + " " for s in Y_con])
+
+    S_len = len(S_vow)
+    Y_len = len(Y_vow)
+    S_con = (S_con + " " * (S_len - len(S_con)))[:S_len]
+    S_acc = (S_acc + " " * (S_len - len(S_acc)))[:S_len]
+    S_pos = (S_pos + " " * (S_len - len(S_pos)))[:S_len]
+    S_acccon = (S_acccon + " " * (S_len - len(S_acccon)))[:S_len]
+    S_gosh = (S_gosh + " " * (S_len - len(S_gosh)))[:S_len]
+    Y_vow = (Y_vow + " " * (Y_len - len(Y_vow)))[:Y_len]
+    Y_con = (Y_con + " " * (Y_len - len(Y_con)))[:Y_len]
+
+    roman_map = tdm.roman_map
+    accent_map = tdm.accent_map
+    char_symbol_to_numeric = tdm.symbol_map.char_symbol_to_numeric
+    s_np = (
+        np.array([roman_map[c] for c in S_vow], np.int32),
+        np.array([roman_map[c] for c in S_con], np.int32),
+        np.array([char_symbol_to_numeric[c] for c in S_pos], np.int32),
+        np.array([accent_map[c] for c in S_acc], np.int32),
+        np.array([char_symbol_to_numeric[c] for c in S_acccon], np.int32),
+        np.array([char_symbol_to_numeric[c] for c in S_gosh], np.int32),
+    )
+    y_np = (
+        np.array([roman_map[c] for c in Y_vow], np.int32),
+        np.array([roman_map[c] for c in Y_con], np.int32),
+    )
+    return s_np, y_np
+
+
+def assert_same_encoding(actual, expected):
+    for a, e in zip(actual[0] + actual[1], expected[0] + expected[1]):
+        assert a.dtype == np.int32
+        np.testing.assert_array_equal(a, e)
+
+
+@pytest.mark.parametrize(
+    "morphemes, yomi",
+    [
+        ([("ハシ", "名詞-普通名詞-一般", "和", "2", "C3")], "ハシ"),
+        ([("トーキョー", "名詞-固有名詞-地名-一般", "固", "0", "")], "トウキョウ"),
+        (
+            [
+                ("コクリツ", "名詞-普通名詞-一般", "漢", "0", "C2"),
+                ("コッカイ", "名詞-普通名詞-一般", "漢", "0", "C2"),
+                ("トショカン", "名詞-普通名詞-一般", "漢", "2", "C1"),
+            ],
+            "コクリツコッカイトショカン",
+        ),
+        ([("ガッコー", "名詞-普通名詞-一般", "漢", "0", "C2")], "ガッコウ"),
+    ],
+)
+def test_encode_fields_matches_tdmelodic_loader(tdm, morphemes, yomi):
+    s_codes = surface_codes(tdm, morphemes)
+    # The reading can be longer or shorter than the surface pronunciation
+    y_codes = yomi_codes(tdm, yomi)
+    expected = loader_encode(tdm, s_codes, y_codes)
+    assert_same_encoding(encode_fields(s_codes, y_codes, *tdm.luts), expected)
+
+
+def test_encode_fields_pads_and_truncates_like_tdmelodic_loader(tdm):
+    # Fields shorter and longer than their vowel sequence get padded with the
+    # " " code or truncated (S_acc always has exactly S_len characters)
+    s_codes = (
+        ["iaaa", "o"],
+        ["kb"],  # Short: padded
+        ["H.L..", "LH"],
+        ["7777777", "77"],  # Long: truncated
+        ["1"],
+        ["22", "2", "2"],
+    )
+    y_codes = (["iaaao"], ["kb"])
+    expected = loader_encode(tdm, s_codes, y_codes)
+    actual = encode_fields(s_codes, y_codes, *tdm.luts)
+    assert_same_encoding(actual, expected)
+
+    # The blank code differs per map: roman " " is 1, the symbol maps' " " is 0
+    roman_lut, accent_lut, symbol_lut = tdm.luts
+    assert roman_lut[ord(" ")] == tdm.roman_map[" "] == 1
+    assert symbol_lut[ord(" ")] == tdm.symbol_map.char_symbol_to_numeric[" "] == 0
+    assert actual[0][1][-1] == 1
+    assert actual[0][4][-1] == 0
+    # accent_map has no " " (the loader would raise KeyError): build_lut maps it to 0
+    assert " " not in tdm.accent_map
+    assert accent_lut[ord(" ")] == 0
+
+
+def loop_visualization(morae, pattern):
+    # The per-mora loop render_accent replaced
+    display_str = ""
+    for i, (m, p) in enumerate(zip(morae, pattern)):
+        prefix = ""
+        suffix = ""
+        if p == 2:  # High
+            if i == 0 or pattern[i - 1] == 1:
+                if i > 0:
+                    prefix = "["
+        if p == 2:
+            if i + 1 < len(pattern) and pattern[i + 1] == 1:
+                suffix = "]"
+        display_str += prefix + m + suffix
+    return display_str
+
+
+@pytest.mark.parametrize(
+    "morae, pattern, expected",
+    [
+        (["ハ", "シ"], [1, 2], "ハ[シ"),  # Rise into the last mora
+        (["ハ", "シ"], [2, 1], "ハ]シ"),  # Fall after the first mora
+        (["タ", "マ", "ゴ"], [1, 2, 1], "タ[マ]ゴ"),
+        (["ト", "ー", "キョ", "ー"], [1, 2, 2, 2], "ト[ーキョー"),  # Flat after the rise
+        (["マ", "ク", "ラ"], [1, 1, 1], "マクラ"),  # No transition at all
+        (["ハ", "シ"], [2, 2], "ハシ"),  # High from the first mora: no "["
+        (["イ", "ノ", "チ"], [2, 1, 1], "イ]ノチ"),
+        (["ア"], [2], "ア"),  # High last mora: no "]"
+        (["ハ", "シ"], [1, 2, 1], "ハ[シ]"),  # Fall after the last shown mora
+        (["ハ", "シ", "ガ"], [1, 2], "ハ[シ"),  # zip stops at the shorter one
+        ([], [], ""),
+    ],
+)
+def test_render_accent(morae, pattern, expected):
+    assert render_accent(morae, pattern) == expected
+    assert render_accent(morae, np.array(pattern, dtype=np.uint8)) == expected
+    assert loop_visualization(morae, pattern) == expected
+
+
+def test_render_accent_matches_loop_on_random_patterns():
+    rng = np.random.RandomState(0)
+    for length in range(1, 10):
+        morae = [chr(ord("ア") + i) for i in range(length)]
+        for _ in range(20):
+            pattern = rng.randint(1, 3, length).tolist()
+            assert render_accent(morae, pattern) == loop_visualization(morae, pattern)
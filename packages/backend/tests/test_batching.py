@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from batching import AccentBatcher  # noqa: E402
+
+
+class PaddingSensitiveModel:
+    # Like tdmelodic's unmasked attention, every output depends on the mean over
+    # the whole (possibly padded) surface axis
+
+    def infer(self, X_s, X_y, y_dummy_GT):
+        context = X_s[0].sum(axis=1, keepdims=True) // X_s[0].shape[1]
+        return X_y[0] + context
+
+
+def make_input(s_len, y_len, seed):
+    rng = np.random.RandomState(seed)
+    s_np = tuple(rng.randint(1, 40, s_len).astype(np.int32) for _ in range(6))
+    y_np = tuple(rng.randint(1, 40, y_len).astype(np.int32) for _ in range(2))
+    return s_np, y_np
+
+
+def test_infer_does_not_depend_on_batch_neighbours():
+    batcher = AccentBatcher(PaddingSensitiveModel(), max_wait_ms=200)
+    short = make_input(4, 3, seed=0)
+    longer = make_input(11, 9, seed=1)
+
+    alone = batcher.infer(*short)
+
+    # Submitted together, so both land in the same collection window
+    batched = batcher.submit(*short)
+    other = batcher.submit(*longer)
+
+    np.testing.assert_array_equal(batched.result(), alone)
+    assert len(other.result()) == 9
+
+
+class BlockingModel:
+    # Holds the first forward pass until released, recording every batch size
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.batch_sizes = []
+
+    def infer(self, X_s, X_y, y_dummy_GT):
+        self.batch_sizes.append(len(X_y[0]))
+        self.started.set()
+        self.release.wait(timeout=5)
+        return X_y[0]
+
+
+def test_no_wait_still_batches_queued_inputs():
+    model = BlockingModel()
+    batcher = AccentBatcher(model, max_wait_ms=0)
+
+    first = batcher.submit(*make_input(4, 3, seed=0))
+    assert model.started.wait(timeout=5)
+    # Queued while the model is busy: collected together once it is free
+    queued = [batcher.submit(*make_input(4, 3, seed=i)) for i in range(1, 4)]
+    model.release.set()
+
+    first.result(timeout=5)
+    for future in queued:
+        future.result(timeout=5)
+    assert model.batch_sizes == [1, 3]
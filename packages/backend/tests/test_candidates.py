@@ -0,0 +1,127 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from candidates import (  # noqa: E402
+    Candidate,
+    CandidatePool,
+    decode_pattern,
+    load_candidates,
+)
+
+
+def make_candidate(text, mora_count):
+    return Candidate(text, "ア" * mora_count, [1] * mora_count, "", mora_count)
+
+
+def make_pool():
+    # Sorted by mora count, as load_candidates returns them
+    return CandidatePool(
+        [
+            make_candidate("a", 2),
+            make_candidate("b", 2),
+            make_candidate("c", 3),
+            make_candidate("d", 5),
+            make_candidate("e", 5),
+            make_candidate("f", 5),
+        ]
+    )
+
+
+def test_pick_exact_count_returns_only_that_bucket():
+    pool = make_pool()
+    picked = {pool.pick(5, 5).text for _ in range(200)}
+    assert picked == {"d", "e", "f"}
+    assert pool.pick(3, 3).text == "c"
+
+
+def test_pick_range_covers_every_bucket_inside_it():
+    pool = make_pool()
+    picked = {pool.pick(2, 3).text for _ in range(200)}
+    assert picked == {"a", "b", "c"}
+
+
+def test_pick_missing_count_returns_none():
+    pool = make_pool()
+    assert pool.pick(4, 4) is None
+    assert pool.pick(6, 8) is None
+    assert pool.pick(1, 1) is None
+    assert pool.pick(5, 2) is None
+
+
+def test_pick_from_empty_pool_returns_none():
+    assert CandidatePool([]).pick(2, 8) is None
+
+
+def test_decode_pattern_bytes():
+    assert decode_pattern(bytes([1, 2, 2, 1])) == [1, 2, 2, 1]
+
+
+def test_decode_pattern_legacy_json_text():
+    assert decode_pattern("[1, 2, 2, 1]") == [1, 2, 2, 1]
+
+
+def write_db(path, with_accent_code):
+    conn = sqlite3.connect(path)
+    columns = "id INTEGER PRIMARY KEY, text TEXT, reading TEXT, accent_pattern, "
+    if with_accent_code:
+        columns += "accent_code TEXT, "
+    conn.execute(f"CREATE TABLE candidates ({columns}mora_count INTEGER)")
+    rows = [
+        (1, "箸", "ハシ", bytes([2, 1]), "ハ]シ", 2),
+        (2, "卵", "タマゴ", "[1, 2, 1]", "タ[マ]ゴ", 3),  # Legacy JSON pattern
+        (3, "橋", "ハシ", bytes([1, 2]), "ハ[シ", 2),
+    ]
+    if not with_accent_code:
+        rows = [row[:4] + row[5:] for row in rows]
+    placeholders = ", ".join("?" * len(rows[0]))
+    conn.executemany(f"INSERT INTO candidates VALUES ({placeholders})", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_load_candidates_reads_stored_accent_code(tmp_path):
+    path = str(tmp_path / "candidates.db")
+    write_db(path, with_accent_code=True)
+
+    def visualize(reading, pattern):
+        raise AssertionError("stored accent codes must not be recomputed")
+
+    pool = load_candidates(path, visualize)
+    assert pool.candidates == [
+        Candidate("箸", "ハシ", [2, 1], "ハ]シ", 2),
+        Candidate("橋", "ハシ", [1, 2], "ハ[シ", 2),
+        Candidate("卵", "タマゴ", [1, 2, 1], "タ[マ]ゴ", 3),
+    ]
+
+
+def test_load_candidates_computes_missing_accent_code(tmp_path):
+    path = str(tmp_path / "candidates.db")
+    write_db(path, with_accent_code=False)
+    calls = []
+
+    def visualize(reading, pattern):
+        calls.append((reading, pattern))
+        return f"{reading}:{pattern}"
+
+    pool = load_candidates(path, visualize)
+    assert [c.accent_code for c in pool.candidates] == [
+        "ハシ:[2, 1]",
+        "ハシ:[1, 2]",
+        "タマゴ:[1, 2, 1]",
+    ]
+    assert len(calls) == 3
+    assert pool.pick(3, 3).text == "卵"
+
+
+def test_load_candidates_missing_db_raises_without_creating_it(tmp_path):
+    # The app catches this at startup and serves an empty pool
+    path = tmp_path / "candidates.db"
+    with pytest.raises(sqlite3.OperationalError):
+        load_candidates(str(path), lambda reading, pattern: "")
+    assert not path.exists()
@@ -0,0 +1,16 @@
+import os
+
+# Keep BLAS/OpenMP single-threaded. The model's matmuls are tiny, and concurrency
+# comes from the executor and uvicorn workers (or build_db.py's worker processes)
+# instead. Import this module before numpy or chainer, so the defaults take effect.
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+
+def omp_num_threads() -> int:
+    # OMP_NUM_THREADS may also be a nested list such as "4,2": use the outer level,
+    # and treat anything unparsable as 1
+    try:
+        return max(int(os.environ["OMP_NUM_THREADS"].split(",")[0]), 1)
+    except (KeyError, ValueError):
+        return 1